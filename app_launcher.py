@@ -5,52 +5,230 @@ Steam Games Downloader - Main Launcher
 
 import os
 import sys
+import atexit
+import collections
+import dataclasses
+import functools
+import queue
+import select
+import signal
 import logging
+import logging.handlers
 import argparse
 import threading
-from pathlib import Path
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Add health check server
-from flask import Flask
-import threading
+logger = logging.getLogger('launcher')
+
+# Environment snapshot taken once at import
+_IS_CLOUD = os.environ.get('ENVIRONMENT') == 'cloud'
+_DEFAULT_PORT = int(os.environ.get('PORT', 7860))
+
+HEALTH_BODY = b'{"status":"healthy"}'
+ROOT_BODY = b'Steam Games Downloader is running. Access the UI on port 8080.'
+
+# Complete /health response, built once and written verbatim for each probe
+HEALTH_REQUEST_PREFIX = b'GET /health '
+HEALTH_RESPONSE = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Content-Length: ' + str(len(HEALTH_BODY)).encode() + b'\r\n'
+    b'Connection: close\r\n'
+    b'\r\n' + HEALTH_BODY
+)
+
+class HealthCheckHandler(BaseHTTPRequestHandler):
+    """Serves the static health check endpoints"""
+    
+    routes = {
+        '/health': (HEALTH_BODY, 'application/json'),
+        '/': (ROOT_BODY, 'text/plain; charset=utf-8'),
+    }
+    
+    def handle_one_request(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if self.raw_requestline.startswith(HEALTH_REQUEST_PREFIX):
+            # Fast path: skip request parsing and header assembly entirely
+            while self.rfile.readline(65537) not in (b'\r\n', b'\n', b''):
+                pass
+            self.wfile.write(HEALTH_RESPONSE)
+            self.close_connection = True
+            return
+        
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+        if self.command == 'GET':
+            self.do_GET()
+        elif self.command == 'HEAD':
+            self.do_HEAD()
+        else:
+            self._send_method_not_allowed()
+            return
+        self.wfile.flush()
+    
+    def _send_method_not_allowed(self):
+        self.send_response(405)
+        self.send_header('Allow', 'GET, HEAD')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def _send_route_headers(self):
+        """Send status and headers for the requested route, returning its body"""
+        route = self.routes.get(self.path)
+        if route is None:
+            self.send_error(404)
+            return None
+        body, content_type = route
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        return body
+    
+    def do_GET(self):
+        body = self._send_route_headers()
+        if body is not None:
+            self.wfile.write(body)
+    
+    def do_HEAD(self):
+        self._send_route_headers()
+    
+    def log_message(self, format, *args):
+        # Probes arrive every few seconds; don't write an access line for each
+        pass
 
 def start_health_check_server(port=8081):
     """Start a simple health check server"""
-    app = Flask("health_check")
+    server = ThreadingHTTPServer(('0.0.0.0', port), HealthCheckHandler)
+    server.daemon_threads = True
     
-    @app.route('/health')
-    def health_check():
-        return '{"status": "healthy"}'
+    # Run in a separate thread
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    logger.info(f"Health check server running on port {port}")
+
+class BatchedFileHandler(logging.Handler):
+    """Appends log records to a file in batches written by a flusher thread"""
     
-    @app.route('/')
-    def root():
-        return 'Steam Games Downloader is running. Access the UI on port 8080.'
+    def __init__(self, filename, flush_interval=0.05, batch_bytes=4096):
+        super().__init__()
+        self.baseFilename = os.path.abspath(filename)
+        self.flush_interval = flush_interval
+        self.batch_bytes = batch_bytes
+        # O_APPEND makes each os.write() an atomic append at end of file
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_CLOEXEC', 0)
+        self._fd = os.open(self.baseFilename, flags, 0o644)
+        self._pending = collections.deque()
+        self._pending_bytes = 0
+        self._sync_pending = False
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._has_data = threading.Event()
+        self._batch_full = threading.Event()
+        self._closed = False
+        threading.Thread(target=self._flush_loop, name='log-flusher', daemon=True).start()
     
-    # Run in a separate thread
-    threading.Thread(
-        target=lambda: app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False),
-        daemon=True
-    ).start()
+    def emit(self, record):
+        try:
+            data = (self.format(record) + '\n').encode('utf-8')
+        except Exception:
+            self.handleError(record)
+            return
+        with self._pending_lock:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            full = self._pending_bytes >= self.batch_bytes
+            if record.levelno >= logging.ERROR:
+                self._sync_pending = True
+                full = True
+        self._has_data.set()
+        if full:
+            self._batch_full.set()
+    
+    def _flush_loop(self):
+        while not self._closed:
+            # Sleep until something is logged, then give the batch a short window to grow
+            self._has_data.wait()
+            self._batch_full.wait(self.flush_interval)
+            self._has_data.clear()
+            self._batch_full.clear()
+            self.flush()
+    
+    def flush(self):
+        """Write all pending records with a single os.write()"""
+        with self._write_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                batch = b''.join(self._pending)
+                self._pending.clear()
+                self._pending_bytes = 0
+                sync = self._sync_pending
+                self._sync_pending = False
+            if self._fd is None:
+                return
+            view = memoryview(batch)
+            while view:
+                view = view[os.write(self._fd, view):]
+            # Only errors are worth forcing to disk; skip the metadata sync
+            if sync:
+                getattr(os, 'fdatasync', os.fsync)(self._fd)
     
-    logging.getLogger('launcher').info(f"Health check server running on port {port}")
+    def close(self):
+        self._closed = True
+        self._has_data.set()
+        self.flush()
+        with self._write_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        super().close()
 
 def configure_logging(debug=False):
     """Set up logging configuration"""
     log_level = logging.DEBUG if debug else logging.INFO
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    formatter = logging.Formatter(log_format)
     
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('steam_downloader.log')
-        ]
-    )
-    return logging.getLogger('launcher')
+    # The format above never uses these record fields; skip collecting them
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    # Handlers do their I/O on a listener thread; callers only enqueue records
+    file_handler = BatchedFileHandler('steam_downloader.log')
+    handlers = [
+        logging.StreamHandler(),
+        file_handler
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # atexit runs in reverse order: drain the queue first, then flush the file
+    atexit.register(file_handler.flush)
+    atexit.register(listener.stop)
+    
+    return logger
 
-def parse_arguments():
-    """Parse command line arguments"""
+def _build_parser():
+    """Build the command line argument parser"""
     parser = argparse.ArgumentParser(
         description='Steam Games Downloader Launcher'
     )
@@ -62,7 +240,7 @@ def parse_arguments():
     parser.add_argument(
         '--port',
         type=int,
-        default=int(os.getenv('PORT', 7860)),
+        default=_DEFAULT_PORT,
         help='Web server port'
     )
     parser.add_argument(
@@ -86,20 +264,69 @@ def parse_arguments():
         default=8081,
         help='Health check server port'
     )
-    return parser.parse_args()
+    parser.add_argument(
+        '--no-install-tunnel',
+        action='store_true',
+        help="Don't download a missing Gradio tunneling binary into gradio's package dir"
+    )
+    return parser
+
+# Built once at import; argparse setup is not repeated per call
+_PARSER = _build_parser()
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class LaunchOptions:
+    """Parsed command line options"""
+    debug: bool
+    port: int
+    host: str
+    no_browser: bool
+    no_share: bool
+    health_port: int
+    no_install_tunnel: bool
+
+@functools.lru_cache(maxsize=1)
+def parse_arguments():
+    """Parse command line arguments (sys.argv is constant per process)"""
+    namespace = _PARSER.parse_args(namespace=types.SimpleNamespace())
+    return LaunchOptions(**vars(namespace))
+
+# Directories already known to exist in this process
+_ensured_dirs = set()
+
+def _ensure_dirs(parent, children):
+    """Create missing child directories, walking the shared parent path only once"""
+    missing = []
+    for child in children:
+        path = os.path.join(parent, child)
+        if path in _ensured_dirs:
+            continue
+        try:
+            os.stat(path)
+        except FileNotFoundError:
+            missing.append(path)
+            continue
+        _ensured_dirs.add(path)
+    
+    if missing:
+        os.makedirs(parent, exist_ok=True)
+        for path in missing:
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                pass
+            _ensured_dirs.add(path)
 
 def initialize_environment():
     """Ensure required environment is set up"""
     # Create essential directories
-    Path('data/downloads').mkdir(parents=True, exist_ok=True)
-    Path('data/config').mkdir(parents=True, exist_ok=True)
+    _ensure_dirs('data', ('downloads', 'config'))
     
     # Initialize components
     from steamcmd_manager import get_steamcmd
     steamcmd = get_steamcmd()  # Auto-initializes if needed
     
     # Ensure SteamCMD is installed
-    logger = logging.getLogger('launcher')
     if not steamcmd.is_installed():
         logger.info("SteamCMD not installed. Installing now...")
         if steamcmd.install():
@@ -109,35 +336,122 @@ def initialize_environment():
     else:
         logger.info("SteamCMD is already installed")
 
-def verify_tunnel_binary():
-    """Verify that the Gradio tunneling binary exists"""
-    logger = logging.getLogger('launcher')
-    binary_path = "/usr/local/lib/python3.10/site-packages/gradio/frpc_linux_amd64_v0.3"
+TUNNEL_BINARY_URL = "https://cdn-media.huggingface.co/frpc-gradio-0.3/frpc_linux_amd64"
+
+def install_gradio_tunnel_binary(binary_path):
+    """Download the Gradio tunneling binary and move it into place once complete"""
+    import shutil
+    import urllib.request
+    
+    # Hidden name, so an interrupted download never looks like an installed binary
+    directory, name = os.path.split(binary_path)
+    part_path = os.path.join(directory, f".{name}.part")
+    
+    logger.info(f"Downloading Gradio tunneling binary from {TUNNEL_BINARY_URL}")
+    try:
+        with urllib.request.urlopen(TUNNEL_BINARY_URL, timeout=60) as resp, \
+                open(part_path, 'wb', buffering=1 << 20) as dst:
+            shutil.copyfileobj(resp, dst, length=1 << 20)
+        os.chmod(part_path, 0o755)
+        os.replace(part_path, binary_path)
+    except Exception as e:
+        logger.error(f"Failed to download Gradio tunneling binary: {str(e)}")
+        try:
+            os.unlink(part_path)
+        except OSError:
+            pass
+        return False
     
-    if os.path.exists(binary_path):
-        logger.info(f"Gradio tunneling binary found at {binary_path}")
+    from gradio_interface import tunneling_available
+    tunneling_available.cache_clear()
+    logger.info(f"Gradio tunneling binary installed at {binary_path}")
+    return True
+
+def verify_tunnel_binary(binary_path):
+    """Verify that the Gradio tunneling binary exists"""
+    from gradio_interface import tunneling_available
+    if tunneling_available():
+        logger.info(f"Gradio tunneling binary found in {os.path.dirname(binary_path)}")
         return True
     else:
         logger.warning(f"Gradio tunneling binary not found at {binary_path}")
         return False
 
+def setup_gradio_sharing(args):
+    """Decide whether sharing can be enabled, downloading the tunnel binary only if needed"""
+    if args.no_share:
+        return False
+    
+    # Same location gradio_interface checks, so the UI and the launcher agree
+    from gradio_interface import tunnel_binary_path
+    binary_path = tunnel_binary_path()
+    if verify_tunnel_binary(binary_path):
+        return True
+    if args.no_install_tunnel:
+        return False
+    return install_gradio_tunnel_binary(binary_path)
+
+# Set once a shutdown signal has been received
+_shutdown_event = threading.Event()
+# Read end of the signal wakeup pipe (POSIX only)
+_signal_fd = None
+
+def _install_signal_handlers():
+    """Route SIGINT/SIGTERM through a self-pipe so the handler runs no logging code"""
+    global _signal_fd
+    if os.name == 'posix':
+        r, w = os.pipe()
+        os.set_blocking(r, False)
+        os.set_blocking(w, False)
+        signal.set_wakeup_fd(w)
+        _signal_fd = r
+        handler = lambda *_: None
+    else:
+        handler = lambda *_: _shutdown_event.set()
+    
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+def _wait_for_shutdown():
+    """Block the main thread until a shutdown signal is delivered"""
+    if _signal_fd is None:
+        _shutdown_event.wait()
+        return
+    
+    while not _shutdown_event.is_set():
+        select.select([_signal_fd], [], [])
+        try:
+            data = os.read(_signal_fd, 64)
+        except BlockingIOError:
+            continue
+        for sig in data:
+            logger.info(f"Received signal {sig}, shutting down gracefully...")
+        _shutdown_event.set()
+
+def _stop_services(interface):
+    """Cooperatively stop the UI server and the download worker"""
+    try:
+        interface.close()
+    except Exception as e:
+        logger.warning(f"Error closing interface: {str(e)}")
+    
+    from download_manager import get_download_manager
+    get_download_manager().stop_worker()
+
 def launch_interface(args):
     """Launch the Gradio interface"""
     from gradio_interface import create_interface
     
-    # Get the logger
-    logger = logging.getLogger('launcher')
-    
     # Get the interface
     interface = create_interface()
     
     # Determine if sharing should be enabled
-    enable_sharing = not args.no_share and verify_tunnel_binary()
+    enable_sharing = setup_gradio_sharing(args)
     
-    logger.info(f"Launching interface with sharing={'enabled' if enable_sharing else 'disabled'}")
+    logger.info("Launching interface with sharing=%s", 'enabled' if enable_sharing else 'disabled')
     
     # Start in a thread to avoid blocking if health checks are important
-    if os.environ.get('ENVIRONMENT') == 'cloud':
+    if _IS_CLOUD:
         # In cloud environment, run in thread to allow health checks to respond
         def gradio_thread_func():
             try:
@@ -157,35 +471,26 @@ def launch_interface(args):
         thread.daemon = True
         thread.start()
         
-        logger.info("Gradio thread started, now entering keep-alive loop")
+        logger.info("Gradio thread started, waiting for shutdown signal")
         
-        # Keep the main thread alive with an infinite loop
+        # Keep the main thread alive until a shutdown signal arrives
         # This is critical for container environments
-        try:
-            # Keep the application running indefinitely
-            import time
-            while True:
-                # Check if our thread is still alive
-                if not thread.is_alive():
-                    logger.warning("Gradio thread died, but container will stay alive")
-                    
-                # Sleep for a while to avoid CPU usage
-                time.sleep(10)
-                
-        except KeyboardInterrupt:
-            logger.info("Received keyboard interrupt, shutting down...")
+        _wait_for_shutdown()
         
         logger.info("Main loop exited")
+        _stop_services(interface)
     else:
-        # For local/development environment, block on the interface
+        # For local/development environment, serve until a shutdown signal arrives
         interface.launch(
             server_name=args.host,
             server_port=args.port,
             share=enable_sharing,
-            prevent_thread_lock=False,
+            prevent_thread_lock=True,
             show_api=False,
             quiet=True
         )
+        _wait_for_shutdown()
+        _stop_services(interface)
         
         logger.info("Interface server has stopped")
 
@@ -195,23 +500,16 @@ def main():
     logger = configure_logging(args.debug)
     
     logger.info("Starting Steam Games Downloader")
-    logger.debug(f"Python version: {sys.version}")
-    logger.debug(f"Working directory: {os.getcwd()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Python version: %s", sys.version)
+        logger.debug("Working directory: %s", os.getcwd())
     
     try:
         # Set up signal handling
-        import signal
-        def signal_handler(sig, frame):
-            logger.info(f"Received signal {sig}, shutting down gracefully...")
-            # Don't exit immediately to allow cleanup
-            threading.Timer(2.0, lambda: sys.exit(0)).start()
-        
-        # Install signal handlers
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        _install_signal_handlers()
         
         # Start health check server first
-        if os.environ.get('ENVIRONMENT') == 'cloud':
+        if _IS_CLOUD:
             # In cloud environment, health checks are critical
             logger.info("Starting health check server for cloud environment")
             start_health_check_server(args.health_port)
@@ -222,8 +520,10 @@ def main():
         # Launch the main interface
         launch_interface(args)
         
-        # This will only be reached if interface.launch() finishes
-        logger.warning("Interface launch returned unexpectedly. Container will exit.")
+        if _shutdown_event.is_set():
+            logger.info("Shutdown complete")
+        else:
+            logger.warning("Interface launch returned unexpectedly. Container will exit.")
         
     except Exception as e:
         logger.critical(f"Fatal error: {str(e)}", exc_info=True)
@@ -4,10 +4,17 @@ Configuration Manager for Steam Games Downloader
 """
 
 import os
+import copy
 import json
 import logging
+import threading
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG = {
@@ -23,6 +30,35 @@ DEFAULT_CONFIG = {
     "auto_update": True
 }
 
+def _loads(data):
+    """Parse JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj, indent=False, sort_keys=False):
+    """Serialize to JSON bytes, using orjson when available
+    
+    The stdlib fallback produces the same layout, so files don't change
+    format depending on whether orjson is installed.
+    """
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(
+        obj,
+        indent=2 if indent else None,
+        separators=None if indent else (',', ':'),
+        sort_keys=sort_keys,
+        ensure_ascii=False
+    ).encode('utf-8')
+
+# Parsed config files keyed by (absolute path, st_mtime_ns, st_size)
+_PARSE_CACHE = {}
+
+def _stat_key(path, st):
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
 class ConfigManager:
     def __init__(self):
         """Initialize configuration"""
@@ -32,9 +68,19 @@ class ConfigManager:
     def _load_config(self):
         """Load or create config file"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
+            try:
+                st = os.stat(self.config_file)
+            except FileNotFoundError:
+                st = None
+            
+            if st is not None:
+                cache_key = _stat_key(self.config_file, st)
+                cached = _PARSE_CACHE.get(cache_key)
+                if cached is not None:
+                    config = copy.deepcopy(cached)
+                else:
+                    config = _loads(Path(self.config_file).read_bytes())
+                    _PARSE_CACHE[cache_key] = copy.deepcopy(config)
                 
                 # Merge with defaults for missing keys
                 for key, value in DEFAULT_CONFIG.items():
@@ -56,8 +102,18 @@ class ConfigManager:
     def _save_config(self, config):
         """Save config to file"""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
+            path = os.path.abspath(self.config_file)
+            try:
+                old_st = os.stat(path)
+                _PARSE_CACHE.pop(_stat_key(path, old_st), None)
+            except FileNotFoundError:
+                pass
+            
+            with open(self.config_file, 'wb') as f:
+                f.write(_dumps(config, indent=True, sort_keys=True))
+            
+            # Next reader of this exact file version gets a copy, not a parse
+            _PARSE_CACHE[_stat_key(path, os.stat(path))] = copy.deepcopy(config)
             return True
         except Exception as e:
             logger.error(f"Error saving config: {str(e)}")
@@ -77,15 +133,18 @@ class ConfigManager:
         self.config = DEFAULT_CONFIG.copy()
         return self._save_config(self.config)
 
-# Singleton instance
-_config = None
+# Singleton instance; the lock keeps concurrent first calls from building two
+_instance = None
+_instance_lock = threading.Lock()
 
 def get_config():
-    """Get configuration instance"""
-    global _config
-    if _config is None:
-        _config = ConfigManager()
-    return _config
+    """Get configuration instance (created once, then cached)"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = ConfigManager()
+    return _instance
 
 if __name__ == "__main__":
     # Test the config manager
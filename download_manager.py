@@ -5,8 +5,9 @@ Handles download queue and processes using SteamCMD
 """
 
 import os
+import asyncio
+import itertools
 import logging
-import queue
 import threading
 from pathlib import Path
 import time
@@ -19,16 +20,36 @@ class DownloadManager:
     
     def __init__(self):
         """Initialize the download manager"""
-        self.download_queue = queue.Queue()
+        # Worker coroutines run on a private event loop in a background thread
+        self.loop = asyncio.new_event_loop()
+        self.download_queue = asyncio.Queue()
         self.active_downloads = {}
+        # Copy-on-write view of active_downloads for lock-free readers
+        self._active_snapshot = ()
+        # SteamCMD processes of in-flight downloads, so shutdown can kill them
+        self._processes = {}
+        self._id_counter = itertools.count(1)
         self.lock = threading.Lock()
         self.worker_thread = None
+        self._workers_task = None
         self.running = False
         
         # Get configuration
         from config import get_config
         self.config = get_config()
         
+        # Per-game directories all live under one fixed prefix
+        self._common_dir = os.path.join(
+            self.config.get('download_path', 'data/downloads'),
+            'steamapps',
+            'common'
+        )
+        self._created_dirs = set()
+        try:
+            os.makedirs(self._common_dir, exist_ok=True)
+        except Exception as e:
+            logger.warning(f"Could not create download directory {self._common_dir}: {str(e)}")
+        
         logger.info("Download Manager initialized")
 
     def add_download(self, app_id, game_name):
@@ -46,130 +67,193 @@ class DownloadManager:
                 logger.error(f"SteamCMD installation error: {str(e)}")
                 raise RuntimeError(f"Cannot add download: SteamCMD installation failed: {str(e)}")
         
-        with self.lock:
-            download_id = f"{app_id}-{int(time.time())}"
-            self.download_queue.put({
-                'id': download_id,
-                'app_id': app_id,
-                'name': game_name,
-                'status': 'queued',
-                'progress': 0
-            })
-            logger.info(f"Added download {download_id}: {game_name} (AppID: {app_id})")
-            return download_id
+        # next() on itertools.count is atomic, so ids are unique without the lock
+        download_id = f"{app_id}-{next(self._id_counter)}"
+        item = {
+            'id': download_id,
+            'app_id': app_id,
+            'name': game_name,
+            'status': 'queued',
+            'progress': 0
+        }
+        # asyncio.Queue is not thread-safe; enqueue from the loop's own thread
+        self.loop.call_soon_threadsafe(self.download_queue.put_nowait, item)
+        logger.info(f"Added download {download_id}: {game_name} (AppID: {app_id})")
+        return download_id
 
     def start_worker(self):
         """Start the download worker thread"""
         if not self.running:
             self.running = True
-            self.worker_thread = threading.Thread(target=self._process_queue)
+            self.worker_thread = threading.Thread(target=self.loop.run_forever)
             self.worker_thread.daemon = True
             self.worker_thread.start()
+            self.loop.call_soon_threadsafe(self._start_workers)
             logger.info("Download worker thread started")
 
     def stop_worker(self):
         """Stop the download worker thread"""
+        # Safe to call twice: once the loop is stopped nothing would run the cancel coroutine
+        if not self.running or self.worker_thread is None:
+            return
         self.running = False
-        if self.worker_thread:
-            self.worker_thread.join()
+        self._kill_processes()
+        asyncio.run_coroutine_threadsafe(self._cancel_workers(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.worker_thread.join()
+        self.worker_thread = None
         logger.info("Download worker stopped")
 
-    def _process_queue(self):
+    def _kill_processes(self):
+        """Kill the SteamCMD processes of in-flight downloads"""
+        from steamcmd_manager import _kill_process_tree
+        
+        # SteamCMD runs in its own session, so it won't see our Ctrl-C or SIGTERM
+        with self.lock:
+            processes = list(self._processes.values())
+        for proc in processes:
+            if proc.poll() is None:
+                logger.info(f"Killing SteamCMD process {proc.pid}")
+                _kill_process_tree(proc)
+
+    def _track_process(self, download_id, proc):
+        """Remember a download's SteamCMD process, or kill it if we're stopping"""
+        from steamcmd_manager import _kill_process_tree
+        
+        with self.lock:
+            if self.running:
+                self._processes[download_id] = proc
+                return
+        _kill_process_tree(proc)
+
+    def _start_workers(self):
+        """Schedule the worker coroutines (runs on the event loop thread)"""
+        self._workers_task = self.loop.create_task(self._spawn_workers())
+
+    async def _cancel_workers(self):
+        """Cancel the worker coroutines and wait for them to unwind"""
+        self._workers_task.cancel()
+        await asyncio.gather(self._workers_task, return_exceptions=True)
+
+    async def _spawn_workers(self):
+        """Run one worker coroutine per allowed concurrent download"""
+        count = max(1, int(self.config.get('max_concurrent_downloads', 1)))
+        await asyncio.gather(*(self._worker() for _ in range(count)))
+
+    async def _worker(self):
         """Process items from download queue"""
+        while self.running:
+            # Blocks in the event loop until an item arrives; no polling
+            item = await self.download_queue.get()
+            try:
+                await self._run_blocking(self._process_item, item)
+            except Exception as e:
+                logger.error(f"Critical error in download worker: {str(e)}")
+            finally:
+                self.download_queue.task_done()
+
+    async def _run_blocking(self, func, *args):
+        """Run a blocking call on a daemon thread and await its result"""
+        future = self.loop.create_future()
+        
+        def resolve(setter, value):
+            # The awaiting worker may have been cancelled by stop_worker()
+            if not future.done():
+                setter(value)
+        
+        def runner():
+            try:
+                result = func(*args)
+            except BaseException as e:
+                self.loop.call_soon_threadsafe(resolve, future.set_exception, e)
+            else:
+                self.loop.call_soon_threadsafe(resolve, future.set_result, result)
+        
+        # Daemon threads so an in-flight SteamCMD download never blocks interpreter exit
+        threading.Thread(target=runner, daemon=True).start()
+        return await future
+
+    def _process_item(self, item):
+        """Download a single queued item"""
         from steamcmd_manager import get_steamcmd
         
-        while self.running:
+        # Extract download ID
+        download_id = item['id']
+        
+        # Update status to downloading
+        with self.lock:
+            self.active_downloads[download_id] = item
+            item['status'] = 'downloading'
+            self._active_snapshot = tuple(self.active_downloads.values())
+        
+        logger.info(f"Starting download {download_id}: {item['name']}")
+        
+        try:
+            # Get SteamCMD instance
+            steamcmd = get_steamcmd()
+            
+            # Verify SteamCMD is installed
+            if not steamcmd.is_installed():
+                logger.error("SteamCMD not installed, attempting to install now...")
+                if not steamcmd.install():
+                    raise RuntimeError("SteamCMD installation failed")
+            
+            # Set download path
+            download_path = f"{self._common_dir}{os.sep}app_{item['app_id']}"
+            
+            # Ensure directory exists
             try:
-                # Get item from queue with timeout
-                try:
-                    item = self.download_queue.get(timeout=1)
-                except queue.Empty:
-                    continue
-                
-                # Extract download ID
-                download_id = item['id']
-                
-                # Update status to downloading
-                with self.lock:
-                    self.active_downloads[download_id] = item
-                    item['status'] = 'downloading'
-                
-                logger.info(f"Starting download {download_id}: {item['name']}")
-                
-                try:
-                    # Get SteamCMD instance
-                    steamcmd = get_steamcmd()
+                if download_path not in self._created_dirs:
+                    os.makedirs(download_path, exist_ok=True)
+                    self._created_dirs.add(download_path)
+            except Exception as path_error:
+                logger.error(f"Failed to create download directory: {str(path_error)}")
+                # Try alternate directory
+                download_path = os.path.join(os.getcwd(), 'downloads', f"app_{item['app_id']}")
+                os.makedirs(download_path, exist_ok=True)
+                logger.info(f"Using alternate download path: {download_path}")
+            
+            # Start download
+            success = steamcmd.download_game(
+                app_id=item['app_id'],
+                install_dir=download_path,
+                username=self.config.get('username') if not self.config.get('anonymous_login', True) else None,
+                password=self.config.get('password') if not self.config.get('anonymous_login', True) else None,
+                validate=self.config.get('validate_files', True),
+                platform=self.config.get('default_platform', 'windows'),
+                on_progress=lambda percent, line: item.__setitem__('progress', percent),
+                on_start=lambda proc: self._track_process(download_id, proc)
+            )
+            
+            # Update status based on result
+            with self.lock:
+                self._processes.pop(download_id, None)
+                if success:
+                    item['status'] = 'completed'
+                    item['progress'] = 100
+                    logger.info(f"Download completed: {item['name']}")
                     
-                    # Verify SteamCMD is installed
-                    if not steamcmd.is_installed():
-                        logger.error("SteamCMD not installed, attempting to install now...")
-                        if not steamcmd.install():
-                            raise RuntimeError("SteamCMD installation failed")
-                    
-                    # Set download path
-                    base_download_path = self.config.get('download_path', 'data/downloads')
-                    download_path = os.path.join(
-                        base_download_path,
-                        'steamapps',
-                        'common',
-                        f"app_{item['app_id']}"
-                    )
-                    
-                    # Ensure directory exists
+                    # Update library
                     try:
-                        os.makedirs(download_path, exist_ok=True)
-                    except Exception as path_error:
-                        logger.error(f"Failed to create download directory: {str(path_error)}")
-                        # Try alternate directory
-                        download_path = os.path.join(os.getcwd(), 'downloads', f"app_{item['app_id']}")
-                        os.makedirs(download_path, exist_ok=True)
-                        logger.info(f"Using alternate download path: {download_path}")
-                    
-                    # Start download
-                    success = steamcmd.download_game(
-                        app_id=item['app_id'],
-                        install_dir=download_path,
-                        username=self.config.get('username') if not self.config.get('anonymous_login', True) else None,
-                        password=self.config.get('password') if not self.config.get('anonymous_login', True) else None,
-                        validate=self.config.get('validate_files', True),
-                        platform=self.config.get('default_platform', 'windows')
-                    )
-                    
-                    # Update status based on result
-                    with self.lock:
-                        if success:
-                            item['status'] = 'completed'
-                            item['progress'] = 100
-                            logger.info(f"Download completed: {item['name']}")
-                            
-                            # Update library
-                            try:
-                                from library_manager import get_library_manager
-                                lib = get_library_manager()
-                                lib.add_game(
-                                    app_id=item['app_id'],
-                                    name=item['name'],
-                                    location=download_path
-                                )
-                            except Exception as lib_error:
-                                logger.error(f"Failed to update library: {str(lib_error)}")
-                        else:
-                            item['status'] = 'failed'
-                            logger.error(f"Download failed: {item['name']}")
-                        
-                        self.download_queue.task_done()
-                
-                except Exception as e:
-                    logger.error(f"Error during download of {item['name']}: {str(e)}")
-                    with self.lock:
-                        item['status'] = 'failed'
-                        item['error'] = str(e)
-                        self.download_queue.task_done()
-                    
-            except Exception as e:
-                logger.error(f"Critical error in download worker: {str(e)}")
-                # Sleep briefly to avoid CPU spinning on continuous errors
-                time.sleep(1)
+                        from library_manager import get_library_manager
+                        lib = get_library_manager()
+                        lib.add_game(
+                            app_id=item['app_id'],
+                            name=item['name'],
+                            location=download_path
+                        )
+                    except Exception as lib_error:
+                        logger.error(f"Failed to update library: {str(lib_error)}")
+                else:
+                    item['status'] = 'failed'
+                    logger.error(f"Download failed: {item['name']}")
+        
+        except Exception as e:
+            logger.error(f"Error during download of {item['name']}: {str(e)}")
+            with self.lock:
+                self._processes.pop(download_id, None)
+                item['status'] = 'failed'
+                item['error'] = str(e)
 
     def get_download_status(self, download_id):
         """Get status of a download"""
@@ -180,21 +264,25 @@ class DownloadManager:
 
     def get_queue_status(self):
         """Get current queue status"""
-        with self.lock:
-            return {
-                'queued': self.download_queue.qsize(),
-                'active': len(self.active_downloads),
-                'downloads': list(self.active_downloads.values())
-            }
+        # Tuple assignment is atomic, so UI polls never wait on the worker's lock
+        snapshot = self._active_snapshot
+        return {
+            'queued': self.download_queue.qsize(),
+            'active': len(snapshot),
+            'downloads': list(snapshot)
+        }
 
-# Singleton instance
+# Singleton instance; the lock keeps concurrent first calls from building two
 _instance = None
+_instance_lock = threading.Lock()
 
 def get_download_manager():
     """Get the singleton download manager instance"""
     global _instance
     if _instance is None:
-        _instance = DownloadManager()
+        with _instance_lock:
+            if _instance is None:
+                _instance = DownloadManager()
     return _instance
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@ Gradio Interface for Steam Games Downloader
 """
 
 import os
+import re
+import functools
 import logging
 import gradio as gr
 from download_manager import get_download_manager
@@ -11,11 +13,29 @@ from config import get_config
 
 logger = logging.getLogger(__name__)
 
+TUNNEL_BINARY_NAME = "frpc_linux_amd64_v0.3"
+# Any released version; temp or stamp files next to it don't count
+_TUNNEL_BINARY_RE = re.compile(r"frpc_linux_amd64_v[\d.]+")
+
+def tunnel_binary_path():
+    """Where Gradio looks for its tunneling binary: inside its own package dir"""
+    return os.path.join(os.path.dirname(gr.__file__), TUNNEL_BINARY_NAME)
+
+@functools.lru_cache(maxsize=1)
+def tunneling_available():
+    """Check once whether any version of Gradio's tunneling binary is installed"""
+    try:
+        with os.scandir(os.path.dirname(gr.__file__)) as entries:
+            return any(_TUNNEL_BINARY_RE.fullmatch(entry.name) for entry in entries)
+    except OSError:
+        return False
+
 class SteamDownloaderInterface:
     def __init__(self):
         self.download_mgr = get_download_manager()
         self.library_mgr = get_library_manager()
         self.config = get_config()
+        self._steamcmd_path_default = self.config.get("steamcmd_path")
         self.download_mgr.start_worker()
 
     def create_interface(self):
@@ -34,8 +54,7 @@ class SteamDownloaderInterface:
                     gr.Markdown("### Access Information")
                     
                     # Check if tunneling binary exists
-                    tunneling_available = os.path.exists("/usr/local/lib/python3.10/site-packages/gradio/frpc_linux_amd64_v0.3")
-                    if tunneling_available:
+                    if tunneling_available():
                         gr.Markdown("✅ **Public sharing is available** - A public URL will be generated when the app starts.")
                     else:
                         gr.Markdown("⚠️ **Public sharing is NOT available** - This app can only be accessed via direct URL.")
@@ -71,7 +90,6 @@ class SteamDownloaderInterface:
             
             with gr.Column(scale=3):
                 status = gr.Textbox(label="Download Status", interactive=False)
-                progress = gr.Progress()
                 
         download_btn.click(
             fn=self._start_download,
@@ -96,7 +114,7 @@ class SteamDownloaderInterface:
                 gr.Markdown("### SteamCMD Settings")
                 steamcmd_path = gr.Textbox(
                     label="SteamCMD Path",
-                    value=self.config.get("steamcmd_path")
+                    value=self._steamcmd_path_default
                 )
                 test_btn = gr.Button("Test SteamCMD")
                 test_output = gr.Textbox(label="Test Result")
@@ -154,7 +172,7 @@ class SteamDownloaderInterface:
                     return "❌ SteamCMD not installed and installation failed"
             
             # Test if it works
-            if steamcmd.run_command(["+quit"]):
+            if steamcmd.run_command(["+quit"], quiet=True):
                 return "✅ SteamCMD working correctly"
             else:
                 return "❌ SteamCMD test failed - executable exists but command failed"
@@ -7,17 +7,26 @@ Simplified version since we're using a flat structure
 import os
 import re
 import glob
+from concurrent.futures import ThreadPoolExecutor
+
+# Compiled once at import instead of per file
+_REL = re.compile(r'from \.(ui|modules|utils)')
+_ABS = re.compile(r'from (ui|modules|utils)\.')
 
 def fix_file_imports(file_path):
     """Clean up imports in a single file"""
     print(f"Processing file: {file_path}")
     
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        original = f.read()
     
     # Remove any relative imports from old structure
-    content = re.sub(r'from \.(ui|modules|utils)', 'from', content)
-    content = re.sub(r'from (ui|modules|utils)\.', 'from ', content)
+    content = _REL.sub('from', original)
+    content = _ABS.sub('from ', content)
+    
+    # Leave files without old-style imports untouched
+    if content == original:
+        return
     
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(content)
@@ -25,10 +34,13 @@ def fix_file_imports(file_path):
 def main():
     print("Fixing imports in Python files...")
     
-    # Process all Python files in current directory
-    for py_file in glob.glob("*.py"):
-        if py_file not in ['import_fixer.py', 'structure_checker.py']:
-            fix_file_imports(py_file)
+    # Process all Python files in current directory; the work is I/O-bound
+    files = [
+        py_file for py_file in glob.glob("*.py")
+        if py_file not in ['import_fixer.py', 'structure_checker.py']
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(fix_file_imports, files))
     
     print("Import fixes completed!")
 
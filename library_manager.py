@@ -5,72 +5,198 @@ Manages the collection of downloaded games
 """
 
 import os
+import sys
+import atexit
 import logging
-import json
-import pandas as pd
-from pathlib import Path
+import threading
 import time
 
+from config import _dumps, _loads
+
 logger = logging.getLogger(__name__)
 
+# Rewrite the snapshot once the mutation log grows past this size
+WAL_COMPACT_BYTES = 64 * 1024
+# How long the flusher waits for more mutations before writing them out together
+WAL_FLUSH_DELAY = 0.25
+
+def _normalize(app_id):
+    """Return app_id as an interned string key"""
+    if type(app_id) is not str:
+        app_id = str(app_id)
+    return sys.intern(app_id)
+
 class LibraryManager:
     """Manages the game library"""
     
     def __init__(self):
         """Initialize the library manager"""
         self.library_file = "game_library.json"
+        # Mutations since the last snapshot, one JSON record per line
+        self.wal_file = "game_library.wal.jsonl"
+        # Serializes log appends and snapshot rewrites across download workers
+        self._io_lock = threading.RLock()
         self.library = self._load_library()
+        # Mutation records waiting for the flusher thread
+        self._pending = []
+        self._dirty = threading.Event()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        atexit.register(self._flush_wal)
+        # Rendered DataFrame, rebuilt only after the library changes
+        self._df_cache = None
+        self._df_dirty = True
         logger.info("Library Manager initialized")
         
     def _load_library(self):
-        """Load game library from file or create a new one"""
+        """Load game library snapshot and replay the mutation log"""
         try:
             if os.path.exists(self.library_file):
-                with open(self.library_file, 'r') as f:
-                    library = json.load(f)
-                logger.info(f"Loaded library with {len(library)} games")
-                return library
+                with open(self.library_file, 'rb') as f:
+                    library = _loads(f.read())
             else:
                 logger.info("No existing library found, creating new")
-                return {}
+                library = {}
         except Exception as e:
             logger.error(f"Error loading library: {str(e)}")
-            return {}
+            library = {}
+        
+        # Intern keys once so every later lookup compares by identity first
+        library = {_normalize(app_id): game for app_id, game in library.items()}
+        self._replay_wal(library)
+        if library:
+            logger.info(f"Loaded library with {len(library)} games")
+        return library
+        
+    def _replay_wal(self, library):
+        """Apply logged mutations on top of the snapshot"""
+        if not os.path.exists(self.wal_file):
+            return
+        try:
+            with open(self.wal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        record = _loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        logger.warning("Skipping corrupt library log record")
+                        continue
+                    self._apply_record(library, record)
+        except Exception as e:
+            logger.error(f"Error replaying library log: {str(e)}")
+            
+    @staticmethod
+    def _apply_record(library, record):
+        """Apply a single mutation record (replay is idempotent)"""
+        op = record.get('op')
+        app_id = _normalize(record.get('app_id'))
+        if op == 'add':
+            library[app_id] = record['data']
+        elif op == 'remove':
+            library.pop(app_id, None)
+        elif op == 'last_played' and app_id in library:
+            library[app_id]['last_played'] = record['data']
+            
+    def _append_wal(self, op, app_id, data=None):
+        """Queue one mutation for the log; the flusher thread writes it out"""
+        with self._io_lock:
+            self._pending.append({'op': op, 'app_id': app_id, 'data': data})
+        self._dirty.set()
+        
+    def _flush_loop(self):
+        """Coalesce bursts of mutations into a single log append"""
+        while True:
+            self._dirty.wait()
+            time.sleep(WAL_FLUSH_DELAY)
+            self._dirty.clear()
+            self._flush_wal()
+            
+    def _flush_wal(self):
+        """Append all queued mutations to the log with one write and fsync"""
+        with self._io_lock:
+            if not self._pending:
+                return True
+            batch, self._pending = self._pending, []
+            try:
+                with open(self.wal_file, 'ab') as f:
+                    f.write(b"".join(_dumps(record) + b"\n" for record in batch))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                logger.error(f"Error writing library log: {str(e)}")
+                return False
+            self._maybe_compact()
+            return True
+        
+    def _maybe_compact(self):
+        """Fold the log into a fresh snapshot once it grows past WAL_COMPACT_BYTES"""
+        try:
+            if os.path.getsize(self.wal_file) > WAL_COMPACT_BYTES:
+                self._save_library()
+        except OSError:
+            pass
             
     def _save_library(self):
-        """Save library to file"""
+        """Write a full library snapshot and reset the mutation log"""
+        with self._io_lock:
+            try:
+                tmp_file = self.library_file + ".tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(_dumps(self.library, indent=True))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.library_file)
+                # Make the rename durable before the log it replaces goes away
+                self._fsync_dir()
+                
+                # The snapshot now contains every logged and queued mutation
+                self._pending = []
+                if os.path.exists(self.wal_file):
+                    os.remove(self.wal_file)
+                return True
+            except Exception as e:
+                logger.error(f"Error saving library: {str(e)}")
+                return False
+            
+    def _fsync_dir(self):
+        """Flush directory entries (renames, creates) for the library file's directory"""
+        if os.name != 'posix':
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.library_file)), os.O_RDONLY)
         try:
-            with open(self.library_file, 'w') as f:
-                json.dump(self.library, f, indent=4)
-            return True
-        except Exception as e:
-            logger.error(f"Error saving library: {str(e)}")
-            return False
+            os.fsync(fd)
+        finally:
+            os.close(fd)
             
     def add_game(self, app_id, name, location):
         """Add or update a game in the library"""
-        app_id = str(app_id)  # Ensure string format
+        app_id = _normalize(app_id)
+        location = str(location)
+        
+        # Called right after a download, so the contents may have changed; always rescan
+        size = self._get_folder_size(location)
         
         self.library[app_id] = {
             'name': name,
-            'location': str(location),
-            'size': self._get_folder_size(location),
+            'location': location,
+            'size': size,
             'added_date': time.time(),
             'last_played': None
         }
         
         logger.info(f"Added/updated game in library: {name} (AppID: {app_id})")
-        self._save_library()
+        self._df_dirty = True
+        self._append_wal('add', app_id, self.library[app_id])
         return True
         
     def remove_game(self, app_id):
         """Remove a game from the library"""
-        app_id = str(app_id)
+        app_id = _normalize(app_id)
         
         if app_id in self.library:
             game = self.library[app_id]
             del self.library[app_id]
-            self._save_library()
+            self._df_dirty = True
+            self._append_wal('remove', app_id)
             logger.info(f"Removed game from library: {game['name']} (AppID: {app_id})")
             return True
         
@@ -79,7 +205,7 @@ class LibraryManager:
         
     def get_game(self, app_id):
         """Get a game from the library"""
-        return self.library.get(str(app_id))
+        return self.library.get(_normalize(app_id))
         
     def get_all_games(self):
         """Get all games in the library"""
@@ -87,57 +213,87 @@ class LibraryManager:
         
     def update_last_played(self, app_id):
         """Update the last played timestamp for a game"""
-        app_id = str(app_id)
+        app_id = _normalize(app_id)
         
         if app_id in self.library:
             self.library[app_id]['last_played'] = time.time()
-            self._save_library()
+            self._df_dirty = True
+            self._append_wal('last_played', app_id, self.library[app_id]['last_played'])
             return True
         return False
         
     def _get_folder_size(self, folder_path):
         """Calculate the total size of files in a folder (in MB)"""
         try:
-            path = Path(folder_path)
-            if not path.exists():
+            if not os.path.isdir(folder_path):
                 return 0
-                
-            total_size = 0
-            for path in Path(folder_path).rglob('*'):
-                if path.is_file():
-                    total_size += path.stat().st_size
-                    
+            
+            total_size = self._scan_size(folder_path)
             return round(total_size / (1024 * 1024), 2)  # Convert to MB
         except Exception as e:
             logger.error(f"Error calculating folder size: {str(e)}")
             return 0
             
+    def _scan_size(self, folder_path):
+        """Sum file sizes below folder_path using scandir's cached dirent types"""
+        total_size = 0
+        # Explicit stack: no recursion limit on deep trees, unreadable subdirs are skipped
+        stack = [folder_path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            total_size += entry.stat(follow_symlinks=False).st_size
+                        elif entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return total_size
+            
     def get_library_dataframe(self):
         """Convert library to pandas DataFrame for UI display"""
+        # Imported here so processes that never open the library tab don't load pandas
+        import pandas as pd
+        
+        if not self._df_dirty and self._df_cache is not None:
+            return self._df_cache
+            
+        columns = ["App ID", "Name", "Location", "Size", "Last Played"]
+        # Clear first so a mutation during the rebuild marks the cache dirty again
+        self._df_dirty = False
         try:
-            if not self.library:
+            # One snapshot, so concurrent add_game calls can't skew the columns
+            items = list(self.library.items())
+            if not items:
                 # Return empty dataframe with column headers
-                return pd.DataFrame(columns=["App ID", "Name", "Location", "Size", "Last Played"])
-                
-            data = []
-            for app_id, game in self.library.items():
-                last_played = "Never" if not game['last_played'] else time.strftime(
-                    "%Y-%m-%d %H:%M", time.localtime(game['last_played'])
-                )
-                
-                data.append([
-                    app_id,
-                    game['name'],
-                    game['location'],
-                    f"{game['size']} MB",
-                    last_played
-                ])
+                df = pd.DataFrame(columns=columns)
+            else:
+                # Build each column as a list instead of going row by row
+                games = [g for _, g in items]
+                # time.localtime applies the DST rules in force at each timestamp,
+                # not today's offset; missing timestamps become "Never"
+                last_played = [
+                    "Never" if g['last_played'] is None
+                    else time.strftime("%Y-%m-%d %H:%M", time.localtime(g['last_played']))
+                    for g in games
+                ]
                 
-            return pd.DataFrame(data, columns=["App ID", "Name", "Location", "Size", "Last Played"])
+                df = pd.DataFrame({
+                    "App ID": [app_id for app_id, _ in items],
+                    "Name": [g['name'] for g in games],
+                    "Location": [g['location'] for g in games],
+                    "Size": [f"{g['size']} MB" for g in games],
+                    "Last Played": last_played
+                })
+            
+            self._df_cache = df
+            return df
             
         except Exception as e:
+            self._df_dirty = True
             logger.error(f"Error creating library dataframe: {str(e)}")
-            return pd.DataFrame(columns=["App ID", "Name", "Location", "Size", "Last Played"])
+            return pd.DataFrame(columns=columns)
 
 # Singleton instance
 _instance = None
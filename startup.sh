@@ -26,31 +26,7 @@ else
     echo "WARNING: Gradio tunneling binary is missing, sharing functionality will be disabled"
 fi
 
-# Start health check server separately for faster responses
-echo "Starting health check server..."
-python -c "
-import os
-from flask import Flask
-import threading
-
-app = Flask('health_check')
-
-@app.route('/health')
-def health():
-    return '{\"status\": \"healthy\"}'
-
-@app.route('/')
-def home():
-    return 'Steam Games Downloader health check - main app running on port 8080'
-
-threading.Thread(
-    target=lambda: app.run(host='0.0.0.0', port=8081, debug=False),
-    daemon=True
-).start()
-" &
-
-HEALTH_PID=$!
-echo "Health check server started with PID ${HEALTH_PID}"
+# The health check server on port 8081 is started by app_launcher.py (ENVIRONMENT=cloud)
 
 # Run main application
 echo "Starting Steam Games Downloader application..."
@@ -71,7 +47,6 @@ done
 
 # If we get here, the main process has stopped
 echo "Main application process (PID ${PID}) has exited."
-kill -9 $HEALTH_PID 2>/dev/null
 
 # Wait for the main process to terminate completely
 wait $PID 2>/dev/null
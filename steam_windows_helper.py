@@ -13,6 +13,8 @@ import zipfile
 import shutil
 from pathlib import Path
 
+from steamcmd_manager import extract_zip_changed
+
 logger = logging.getLogger(__name__)
 
 def is_windows():
@@ -34,11 +36,12 @@ def download_steamcmd(install_path):
         zip_path = os.path.join(install_path, "steamcmd.zip")
         
         logger.info(f"Downloading SteamCMD from {url}")
-        urllib.request.urlretrieve(url, zip_path)
+        with urllib.request.urlopen(url) as resp, open(zip_path, 'wb') as f:
+            shutil.copyfileobj(resp, f, length=1 << 20)
         
         # Extract zip
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(install_path)
+            extract_zip_changed(zip_ref, install_path)
             
         # Clean up
         os.remove(zip_path)
@@ -65,8 +68,9 @@ def test_steamcmd(install_path):
         # Test SteamCMD
         result = subprocess.run(
             [executable, "+quit"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
             timeout=30,
             creationflags=subprocess.CREATE_NO_WINDOW
         )
@@ -4,28 +4,236 @@ SteamCMD Manager - Container Optimized
 """
 
 import os
+import functools
+import hashlib
+import re
+import signal
 import logging
 import subprocess
+import queue
+import threading
+import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 import tarfile
 import shutil
-import stat
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+_IS_POSIX = os.name == 'posix'
+
+# e.g. " Update state (0x61) downloading, progress: 12.34 (1234 / 10000)"
+_PROGRESS_RE = re.compile(r'Update state \(0x[0-9a-fA-F]+\) [^,]+, progress: ([\d.]+)')
+
+# Where distros put the 32-bit runtime SteamCMD needs (Debian multiarch/multilib, Arch)
+_LIB32_DIRS = ("/lib/i386-linux-gnu", "/usr/lib/i386-linux-gnu", "/usr/lib32", "/lib32")
+# On RHEL-style layouts (64-bit libs in a real lib64 dir) the plain lib dirs are the 32-bit ones
+_LIB32_RHEL_DIRS = ("/usr/lib", "/lib")
+_LIB32_REQUIRED = ("libgcc_s.so.1", "libstdc++.so.6")
+# Set once the libraries were found; cleared when SteamCMD reports them missing
+_deps_ok = False
+
+def _forget_deps():
+    """Drop a cached positive dependency check"""
+    global _deps_ok
+    _deps_ok = False
+
+def _is_rhel_layout():
+    """True when /usr/lib64 is a real directory; on Arch it is a symlink to /usr/lib"""
+    return os.path.isdir("/usr/lib64") and not os.path.islink("/usr/lib64")
+
+@functools.lru_cache(maxsize=1)
+def _detect_pkg_mgr():
+    """Return the first supported package manager on PATH, or None"""
+    return next((p for p in ('apt-get', 'yum', 'pacman') if shutil.which(p)), None)
+
+def _deps_satisfied():
+    """Check whether the 32-bit libraries SteamCMD needs are already installed"""
+    global _deps_ok
+    if _deps_ok:
+        return True
+    
+    dirs = _LIB32_DIRS + (_LIB32_RHEL_DIRS if _is_rhel_layout() else ())
+    _deps_ok = all(
+        any(os.path.exists(os.path.join(d, lib)) for d in dirs)
+        for lib in _LIB32_REQUIRED
+    )
+    return _deps_ok
+
+def _kill_process_tree(proc):
+    """Kill a SteamCMD process together with the children it started"""
+    if _IS_POSIX:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        proc.kill()
+
+def _is_unchanged(target, size, mtime):
+    """Check whether an extracted file already matches an archive member"""
+    try:
+        st = os.stat(target)
+    except OSError:
+        return False
+    return st.st_size == size and st.st_mtime >= mtime
+
+class HashingReader:
+    """File-like reader that feeds everything read through a SHA-256 hasher"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self.hasher = hashlib.sha256()
+        
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.hasher.update(data)
+        return data
+
+def _verify_digest(hasher):
+    """Compare a download digest against STEAMCMD_SHA256 when it is set"""
+    digest = hasher.hexdigest()
+    expected = os.environ.get('STEAMCMD_SHA256', '').strip().lower()
+    if expected and digest != expected:
+        raise RuntimeError(f"SteamCMD download checksum mismatch: expected {expected}, got {digest}")
+    logger.info(f"SteamCMD download SHA-256: {digest}")
+
+class PrefetchReader:
+    """File-like reader that pulls from a stream on a background thread
+    
+    Lets the network download the next chunks while the caller is busy
+    inflating and writing the previous ones.
+    """
+    
+    def __init__(self, stream, chunk_size=1 << 20, depth=8):
+        self._chunks = queue.Queue(maxsize=depth)
+        self._buffer = b""
+        self._pos = 0
+        self._error = None
+        self._eof = False
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._fill, args=(stream, chunk_size), daemon=True
+        )
+        self._thread.start()
+        
+    def _fill(self, stream, chunk_size):
+        try:
+            while not self._closed.is_set() and (chunk := stream.read(chunk_size)):
+                self._put(chunk)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(b"")
+            
+    def _put(self, chunk):
+        # Wait for room, but give up once the reader has been closed
+        while not self._closed.is_set():
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+                
+    def close(self):
+        """Stop the fill thread and drop any chunks it buffered"""
+        self._closed.set()
+        try:
+            while True:
+                self._chunks.get_nowait()
+        except queue.Empty:
+            pass
+            
+
+    def read(self, size=-1):
+        parts = []
+        wanted = size
+        while wanted != 0:
+            if self._pos >= len(self._buffer):
+                if self._eof:
+                    break
+                self._buffer = self._chunks.get()
+                self._pos = 0
+                if not self._buffer:
+                    self._eof = True
+                    if self._error is not None:
+                        raise self._error
+                    break
+            end = len(self._buffer) if wanted < 0 else min(len(self._buffer), self._pos + wanted)
+            parts.append(self._buffer[self._pos:end])
+            if wanted > 0:
+                wanted -= end - self._pos
+            self._pos = end
+        return b"".join(parts)
+
+def _write_tar_member(tar, member, target):
+    """Copy a regular tar member to target in large chunks"""
+    with tar.extractfile(member) as src, open(target, 'wb', buffering=1 << 20) as dst:
+        shutil.copyfileobj(src, dst, length=1 << 16)
+    os.chmod(target, member.mode & 0o777)
+    os.utime(target, (member.mtime, member.mtime))
+
+def extract_tar_changed(tar, dest):
+    """Extract tar members, skipping files already on disk (works on streams)
+    
+    Returns the paths written, so a caller can roll them back.
+    """
+    skipped = 0
+    written = []
+    root = os.path.realpath(dest)
+    # Directories already known to exist, so each is created at most once
+    made_dirs = {root}
+    for member in tar:
+        target = os.path.realpath(os.path.join(root, member.name))
+        if member.isfile() or member.isdir():
+            if target != root and not target.startswith(root + os.sep):
+                logger.warning(f"Skipping tar member outside install dir: {member.name}")
+                continue
+            parent = target if member.isdir() else os.path.dirname(target)
+            if parent not in made_dirs:
+                os.makedirs(parent, exist_ok=True)
+                made_dirs.add(parent)
+            if member.isdir():
+                continue
+            if _is_unchanged(target, member.size, member.mtime):
+                skipped += 1
+                continue
+            written.append(target)
+            _write_tar_member(tar, member, target)
+        else:
+            # Links and the like are rare; let tarfile handle them
+            written.append(os.path.join(root, member.name))
+            tar.extract(member, dest)
+    if skipped:
+        logger.info(f"Skipped {skipped} unchanged files")
+    return written
+
+def extract_zip_changed(zip_ref, dest):
+    """Extract zip members, skipping files already on disk"""
+    skipped = 0
+    for info in zip_ref.infolist():
+        if not info.is_dir():
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            if _is_unchanged(os.path.join(dest, info.filename), info.file_size, mtime):
+                skipped += 1
+                continue
+        zip_ref.extract(info, dest)
+    if skipped:
+        logger.info(f"Skipped {skipped} unchanged files")
+
 class SteamCMD:
     """Container-optimized SteamCMD manager"""
     
     def __init__(self):
         # Auto-detect install path - use local directory if in Windows or permission issues
         default_path = os.path.join(os.getcwd(), 'steamcmd')
-        if os.name == 'posix' and os.access('/home/appuser', os.W_OK):
+        if _IS_POSIX and os.access('/home/appuser', os.W_OK):
             default_path = '/home/appuser/steamcmd'
             
-        self.install_path = Path(os.environ.get('STEAMCMD_PATH', default_path))
-        self.steamcmd_sh = self.install_path / "steamcmd.sh"
-        self.linux32_dir = self.install_path / "linux32"
+        # Set once the install check passes, so later commands skip it
+        self._verified = False
+        self._set_install_path(os.environ.get('STEAMCMD_PATH', default_path))
         
         # Log the path we're using
         logger.info(f"Using SteamCMD path: {self.install_path}")
@@ -52,130 +260,170 @@ class SteamCMD:
             logger.error(f"Error setting up SteamCMD: {str(e)}")
             raise
         
+    def invalidate(self):
+        """Forget a previous successful install check"""
+        self._verified = False
+        
     def is_installed(self):
         """Check if SteamCMD is properly installed"""
-        # First check if files exist
-        basic_check = (self.steamcmd_sh.exists() and 
-                (self.linux32_dir / "steamcmd").exists())
-                
-        if not basic_check:
-            return False
+        if self._verified:
+            return True
             
-        # Try to run a simple command to verify it works
-        try:
-            # Make a very brief test call
-            test_result = subprocess.run(
-                [str(self.steamcmd_sh), "+quit"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=10,
-                check=False
-            )
-            return test_result.returncode == 0
-        except Exception as e:
-            logger.warning(f"SteamCMD exists but fails to run: {str(e)}")
-            return False
+        # Whether it actually runs is found out by the first real command,
+        # which invalidates this check if the binary turns out to be broken
+        self._verified = (os.access(self.steamcmd_sh, os.X_OK) and
+                (self.linux32_dir / "steamcmd").exists())
+        return self._verified
+    
+    def _set_install_path(self, path):
+        """Point this manager at a different SteamCMD install directory"""
+        self.install_path = Path(path)
+        self.steamcmd_sh = self.install_path / "steamcmd.sh"
+        self.linux32_dir = self.install_path / "linux32"
+        # Strings handed to subprocess on every command
+        self._executable_str = str(self.steamcmd_sh if _IS_POSIX else self.install_path / "steamcmd.exe")
+        self._cwd_str = str(self.install_path)
+        self.invalidate()
+        
+    def _candidate_paths(self):
+        """Install locations to try in order, starting with the configured one"""
+        cwd = os.getcwd()
+        candidates = [self.install_path]
+        if _IS_POSIX and os.access('/home/appuser', os.W_OK):
+            candidates.append(Path('/home/appuser/steamcmd'))
+        candidates += [Path(cwd, 'steamcmd'), Path(cwd, 'data', 'steamcmd')]
+        return list(dict.fromkeys(candidates))
     
     def install(self):
         """Install SteamCMD in container-friendly way"""
+        self.invalidate()
         if self.is_installed():
             logger.info("SteamCMD already installed")
             return True
             
-        try:
-            # Check for and install dependencies if needed
-            self._ensure_dependencies()
-            
-            # Create directory if it doesn't exist
-            self.install_path.mkdir(parents=True, exist_ok=True)
-                
-            # Download and extract SteamCMD
-            if os.name == 'posix':  # Linux/Mac
-                url = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd_linux.tar.gz"
-            else:  # Windows
-                url = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
-                
-            logger.info(f"Downloading SteamCMD from {url}")
-            
-            # Download to a temp file first to avoid permission issues
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                temp_path = temp_file.name
+        # Check for and install dependencies if needed (they don't depend on the path)
+        self._ensure_dependencies()
+        
+        for candidate in self._candidate_paths():
+            if candidate != self.install_path:
+                self._set_install_path(candidate)
+                logger.info(f"Changed install path to: {self.install_path}")
                 
             try:
-                # Download SteamCMD
-                urllib.request.urlretrieve(url, temp_path)
-                
-                # Extract based on file type
-                if url.endswith('.tar.gz'):
-                    with tarfile.open(temp_path, 'r:gz') as tar:
-                        tar.extractall(self.install_path)
-                elif url.endswith('.zip'):
-                    import zipfile
-                    with zipfile.ZipFile(temp_path, 'r') as zip_ref:
-                        zip_ref.extractall(self.install_path)
-                
-                # Set executable permissions if needed
-                if os.name == 'posix':
-                    try:
-                        if self.steamcmd_sh.exists():
-                            self.steamcmd_sh.chmod(0o755)
-                        if (self.install_path / "steamcmd").exists():
-                            (self.install_path / "steamcmd").chmod(0o755)
-                    except PermissionError as e:
-                        logger.warning(f"Permission error setting executable bit: {e}")
-                        # Continue anyway as it might still work
-                
-                # Create linux32 directory and copy steamcmd if needed (for Linux)
-                if os.name == 'posix':
-                    self.linux32_dir.mkdir(exist_ok=True)
-                    if not (self.linux32_dir / "steamcmd").exists() and (self.install_path / "steamcmd").exists():
-                        try:
-                            shutil.copy2(
-                                self.install_path / "steamcmd",
-                                self.linux32_dir / "steamcmd"
-                            )
-                            (self.linux32_dir / "steamcmd").chmod(0o755)
-                        except Exception as e:
-                            logger.warning(f"Could not copy steamcmd to linux32 dir: {e}")
-                            # Not critical, continue
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+                self._install_files()
+            except PermissionError as e:
+                logger.error(f"Permission error during installation: {str(e)}")
+                logger.info("Trying alternate install location...")
+                continue
+            except Exception as e:
+                logger.error(f"Installation failed: {str(e)}")
+                return False
             
             # Run once to trigger first-time setup
             logger.info("Running SteamCMD first-time setup...")
-            self.run_command(["+quit"], timeout=120)
+            self.run_command(["+quit"], timeout=120, quiet=True)
             
             return True
             
-        except PermissionError as e:
-            logger.error(f"Permission error during installation: {str(e)}")
-            logger.info("Trying alternate install location...")
-            
-            # Try to use a different directory
-            old_path = self.install_path
-            self.install_path = Path(os.path.join(os.getcwd(), 'data', 'steamcmd'))
-            self.steamcmd_sh = self.install_path / "steamcmd.sh"
-            self.linux32_dir = self.install_path / "linux32"
+        logger.error("Installation failed: no writable install location")
+        return False
+    
+    def _install_files(self):
+        """Download and unpack SteamCMD into the current install path"""
+        # Create directory if it doesn't exist
+        self.install_path.mkdir(parents=True, exist_ok=True)
             
-            logger.info(f"Changed install path to: {self.install_path}")
+        # Download and extract SteamCMD
+        if _IS_POSIX:  # Linux/Mac
+            url = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd_linux.tar.gz"
+        else:  # Windows
+            url = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
             
-            # Try again with the new path (but don't recurse indefinitely)
-            return self.install()
+        logger.info(f"Downloading SteamCMD from {url}")
+        
+        if url.endswith('.tar.gz'):
+            # Stream straight into tarfile: inflate while downloading, no temp archive.
+            # The prefetch thread keeps the socket busy while tarfile inflates and writes
+            # Hashing happens on the prefetch thread, in the same pass as the download
+            with urllib.request.urlopen(url) as resp:
+                hashing = HashingReader(resp)
+                reader = PrefetchReader(hashing)
+                written = []
+                try:
+                    with tarfile.open(fileobj=reader, mode='r|gz', bufsize=1 << 16) as tar:
+                        written = extract_tar_changed(tar, self._cwd_str)
+                    # tarfile stops at the end-of-archive marker; hash any trailing padding too
+                    while reader.read(1 << 20):
+                        pass
+                finally:
+                    # An aborted extraction must not leave the fill thread blocked on a full queue
+                    reader.close()
+            try:
+                _verify_digest(hashing.hasher)
+            except RuntimeError:
+                # Don't leave unverified executables behind for is_installed() to accept
+                for path in written:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                raise
+        elif url.endswith('.zip'):
+            # Zip needs a seekable file, so download to a temp file first
+            import tempfile
+            import zipfile
+            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+                temp_path = temp_file.name
+                with urllib.request.urlopen(url) as resp:
+                    hashing = HashingReader(resp)
+                    shutil.copyfileobj(hashing, temp_file, length=1 << 20)
+            try:
+                _verify_digest(hashing.hasher)
+                with zipfile.ZipFile(temp_path, 'r') as zip_ref:
+                    extract_zip_changed(zip_ref, self._cwd_str)
+            finally:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+        
+        # One directory listing instead of an exists() stat per file
+        present = {entry.name for entry in os.scandir(self.install_path)}
+        
+        # Set executable permissions if needed
+        if _IS_POSIX:
+            try:
+                if "steamcmd.sh" in present:
+                    self.steamcmd_sh.chmod(0o755)
+                if "steamcmd" in present:
+                    (self.install_path / "steamcmd").chmod(0o755)
+            except PermissionError as e:
+                logger.warning(f"Permission error setting executable bit: {e}")
+                # Continue anyway as it might still work
             
-        except Exception as e:
-            logger.error(f"Installation failed: {str(e)}")
-            return False
+        # Create linux32 directory and copy steamcmd if needed (for Linux)
+        if _IS_POSIX:
+            self.linux32_dir.mkdir(exist_ok=True)
+            linux32_present = {entry.name for entry in os.scandir(self.linux32_dir)}
+            if "steamcmd" not in linux32_present and "steamcmd" in present:
+                src = self.install_path / "steamcmd"
+                dst = self.linux32_dir / "steamcmd"
+                try:
+                    try:
+                        # Same bytes either way; a hardlink avoids copying them
+                        os.link(src, dst)
+                    except OSError:
+                        shutil.copy2(src, dst)
+                        dst.chmod(0o755)
+                except Exception as e:
+                    logger.warning(f"Could not copy steamcmd to linux32 dir: {e}")
+                    # Not critical, continue
     
     def _ensure_dependencies(self):
         """Ensure required dependencies are installed"""
         try:
             # Check if we're on a Linux system
-            if os.name != 'posix':
+            if not _IS_POSIX:
                 # On Windows, we need different dependencies
                 logger.info("Running on Windows - checking for Visual C++ Redistributable")
                 # Windows just needs Visual C++ Redistributable which should be present
@@ -184,36 +432,47 @@ class SteamCMD:
             
             # On Linux, we need 32-bit libraries
             logger.info("Running on Linux - checking for dependencies")
+            if _deps_satisfied():
+                logger.info("32-bit libraries already present - skipping package install")
+                return
             
             # Check processor architecture
             import platform
             is_64bit = platform.architecture()[0] == '64bit'
             
             # Check distribution type
-            if shutil.which('apt-get'):
+            pkg_mgr = _detect_pkg_mgr()
+            if pkg_mgr == 'apt-get':
                 logger.info("Installing dependencies via apt-get")
-                # Update package lists
-                subprocess.run(
-                    ["apt-get", "update", "-y"],
-                    check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-                )
                 
                 # Install required packages
                 packages = ["curl", "ca-certificates"]
                 
-                # Add architecture-specific packages
-                if is_64bit:
-                    # 64-bit system needs 32-bit compatibility libraries
-                    try:
-                        # Enable 32-bit architecture if needed
-                        subprocess.run(
-                            ["dpkg", "--add-architecture", "i386"],
-                            check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-                        )
-                        packages.extend(["lib32gcc-s1", "lib32stdc++6", "libc6-i386"])
-                    except Exception as e:
-                        logger.warning(f"Could not enable i386 architecture: {e}")
-                        # Try to install without it
+                # Update package lists while enabling i386. They don't contend:
+                # apt-get update locks /var/lib/apt/lists, dpkg only writes its arch list,
+                # and the lib32* packages below are amd64 multilib packages anyway
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    update = pool.submit(
+                        subprocess.run,
+                        ["apt-get", "update", "-y"],
+                        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                    )
+                    add_arch = pool.submit(
+                        subprocess.run,
+                        ["dpkg", "--add-architecture", "i386"],
+                        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                    ) if is_64bit else None
+                    update.result()
+                
+                    # Add architecture-specific packages
+                    if add_arch is not None:
+                        # 64-bit system needs 32-bit compatibility libraries
+                        try:
+                            add_arch.result()
+                            packages.extend(["lib32gcc-s1", "lib32stdc++6", "libc6-i386"])
+                        except Exception as e:
+                            logger.warning(f"Could not enable i386 architecture: {e}")
+                            # Try to install without it
                 
                 # Install all required packages
                 cmd = ["apt-get", "install", "-y"] + packages
@@ -228,7 +487,7 @@ class SteamCMD:
                 return
             
             # Check for yum (Red Hat/CentOS/Fedora)
-            elif shutil.which('yum'):
+            elif pkg_mgr == 'yum':
                 logger.info("Installing dependencies via yum")
                 
                 # Install required packages  
@@ -249,7 +508,7 @@ class SteamCMD:
                 return
                 
             # Check for pacman (Arch Linux)
-            elif shutil.which('pacman'):
+            elif pkg_mgr == 'pacman':
                 logger.info("Installing dependencies via pacman")
                 subprocess.run(
                     ["pacman", "-Sy", "--noconfirm", "lib32-gcc-libs", "lib32-glibc"],
@@ -268,82 +527,170 @@ class SteamCMD:
         except Exception as e:
             logger.warning(f"Error installing dependencies: {str(e)}")
     
-    def run_command(self, commands, timeout=300):
-        """Run SteamCMD with given commands"""
+    def run_command(self, commands, timeout=300, on_progress=None, quiet=False, on_start=None):
+        """Run SteamCMD with given commands
+        
+        on_progress, if given, is called as on_progress(percent, line) for each
+        progress line SteamCMD prints while the command runs. on_start, if given,
+        is called as on_start(proc) right after SteamCMD is started. With
+        quiet=True the output is discarded and only the exit status is checked.
+        """
         if not self.is_installed() and not self.install():
             raise RuntimeError("SteamCMD not available")
         
-        # Determine which executable to use based on platform
-        if os.name == 'posix':  # Linux/Mac
-            executable = str(self.steamcmd_sh)
-        else:  # Windows
-            executable = str(self.install_path / "steamcmd.exe")
-            
-        cmd = [executable] + commands
-        logger.info(f"Executing: {' '.join(cmd)}")
+        cmd = [self._executable_str] + commands
+        logger.info("Executing: %s", ' '.join(cmd))
         
         try:
             # Add environment variables for better error handling
             env = os.environ.copy()
-            if os.name == 'posix':
+            # Run from the steamcmd directory
+            spawn_kwargs = {'cwd': self._cwd_str}
+            if _IS_POSIX:
                 env['STEAM_NOINTERACTIVE'] = '1'
+                # steamcmd.sh runs the real binary as its child; a session of its own
+                # lets a timeout kill both
+                spawn_kwargs['start_new_session'] = True
             
-            # Run the command with better error capture
-            result = subprocess.run(
+            if quiet:
+                # Self-tests only need the exit status, so skip the pipes entirely
+                proc = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=env,
+                    **spawn_kwargs
+                )
+                if on_start is not None:
+                    on_start(proc)
+                try:
+                    returncode = proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    _kill_process_tree(proc)
+                    proc.wait()
+                    logger.error(f"SteamCMD command timed out after {timeout} seconds")
+                    return False
+                if returncode != 0:
+                    logger.error(f"SteamCMD failed with return code {returncode}")
+                    self._check_broken_install(returncode)
+                    return False
+                return True
+            
+            # Stream merged output line by line so progress is visible while running
+            # and the pipe never fills up and stalls SteamCMD
+            proc = subprocess.Popen(
                 cmd,
-                check=False,  # Changed to False to handle errors ourselves
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
+                stderr=subprocess.STDOUT,
                 text=True,
+                errors='replace',
+                bufsize=1,
                 env=env,
-                cwd=str(self.install_path)  # Run from the steamcmd directory
+                **spawn_kwargs
             )
             
-            # Log the output regardless of success/failure
-            logger.debug(f"SteamCMD output:\n{result.stdout}")
-            if result.stderr:
-                logger.debug(f"SteamCMD stderr:\n{result.stderr}")
+            timed_out = threading.Event()
+            def kill_on_timeout():
+                if proc.poll() is None:
+                    timed_out.set()
+                    # Killing the whole group also closes the child's end of the pipe,
+                    # which ends the read loop below
+                    _kill_process_tree(proc)
+            timer = threading.Timer(timeout, kill_on_timeout)
+            timer.daemon = True
+            timer.start()
+            
+            output = []
+            try:
+                if on_start is not None:
+                    on_start(proc)
+                for line in proc.stdout:
+                    output.append(line)
+                    # Plain substring test first; most lines never reach the regex
+                    if on_progress is not None and "progress:" in line:
+                        match = _PROGRESS_RE.search(line)
+                        if match:
+                            on_progress(float(match.group(1)), line.strip())
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+                proc.stdout.close()
+                # SteamCMD runs in its own session, so nothing else stops it if we bail out early
+                if proc.poll() is None:
+                    _kill_process_tree(proc)
+                    proc.wait()
+            
+            # Log the output regardless of success/failure; only join it when someone will see it
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("SteamCMD output:\n%s", ''.join(output))
+            
+            if timed_out.is_set():
+                logger.error(f"SteamCMD command timed out after {timeout} seconds")
+                return False
             
             # Check return code
-            if result.returncode != 0:
-                logger.error(f"SteamCMD failed with return code {result.returncode}")
-                if "you are missing 32-bit libraries" in result.stderr or "you are missing 32-bit libraries" in result.stdout:
+            if returncode != 0:
+                logger.error(f"SteamCMD failed with return code {returncode}")
+                stdout = ''.join(output)
+                self._check_broken_install(returncode, stdout)
+                if "you are missing 32-bit libraries" in stdout:
                     logger.error("Missing 32-bit libraries. Please install them manually.")
-                    if os.name == 'posix':
+                    if _IS_POSIX:
                         logger.error("For Debian/Ubuntu: sudo apt-get install lib32gcc-s1 lib32stdc++6")
                         logger.error("For RHEL/CentOS: sudo yum install glibc.i686 libstdc++.i686")
                 return False
                 
             return True
             
-        except subprocess.TimeoutExpired:
-            logger.error(f"SteamCMD command timed out after {timeout} seconds")
-            return False
-        except subprocess.CalledProcessError as e:
-            logger.error(f"SteamCMD failed: {e.stderr}")
-            return False
         except Exception as e:
             logger.error(f"Unexpected error running SteamCMD: {str(e)}")
             return False
     
+    def _check_broken_install(self, returncode, output=""):
+        """Drop the cached install check when a failure points at the install itself"""
+        # 126/127: the shell couldn't execute or find the binary
+        missing_libs = "you are missing 32-bit libraries" in output
+        if returncode in (126, 127) or missing_libs:
+            self.invalidate()
+        if missing_libs:
+            # Let the next install attempt run the package manager again
+            _forget_deps()
+    
     def download_game(self, app_id, install_dir, **kwargs):
         """Download a game with container-friendly defaults"""
-        commands = [
-            "+force_install_dir", str(install_dir),
-            "+login", "anonymous",
-            "+app_update", str(app_id),
-            "+quit"
-        ]
+        return self.download_games([(app_id, install_dir)], **kwargs)
+    
+    def download_games(self, specs, **kwargs):
+        """Download several games in one SteamCMD session
         
-        if kwargs.get("validate", True):
-            commands.insert(-1, "validate")
+        specs is a list of (app_id, install_dir) pairs. SteamCMD starts and logs
+        in once, then runs a +force_install_dir/+app_update pair per game.
+        """
+        if not specs:
+            return True
         
+        commands = []
         if platform := kwargs.get("platform"):
-            commands.insert(1, "+@sSteamCmdForcePlatformType")
-            commands.insert(2, platform)
+            commands += ["+@sSteamCmdForcePlatformType", platform]
+        
+        validate = ["validate"] if kwargs.get("validate", True) else []
+        current_dir = str(specs[0][1])
+        # SteamCMD wants the first install dir set before logging in
+        commands += ["+force_install_dir", current_dir, "+login", "anonymous"]
+        for app_id, install_dir in specs:
+            if str(install_dir) != current_dir:
+                current_dir = str(install_dir)
+                commands += ["+force_install_dir", current_dir]
+            commands += ["+app_update", str(app_id)] + validate
+        commands.append("+quit")
         
-        return self.run_command(commands, timeout=3600)
+        return self.run_command(
+            commands,
+            timeout=3600 * len(specs),
+            on_progress=kwargs.get("on_progress"),
+            on_start=kwargs.get("on_start")
+        )
 
 # Singleton instance
 _instance = None
@@ -363,7 +710,7 @@ if __name__ == "__main__":
         sm.install()
     
     print("Testing SteamCMD...")
-    if sm.run_command(["+quit"]):
+    if sm.run_command(["+quit"], quiet=True):
         print("✅ SteamCMD working correctly")
     else:
         print("❌ SteamCMD test failed")
\ No newline at end of file
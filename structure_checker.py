@@ -5,8 +5,11 @@ Application Structure Checker
 
 import os
 import sys
+import argparse
 import importlib
+import importlib.util
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 def print_separator():
     print("-" * 80)
@@ -22,9 +25,26 @@ def check_python_path():
         sys.path.insert(0, current_dir)
         print("  Added current directory to Python path")
 
-def check_imports():
-    """Check if core modules can be imported"""
-    print("Testing imports:")
+def _try_import(module):
+    """Import a module, returning (error, formatted traceback) on failure"""
+    try:
+        importlib.import_module(module)
+        return None, None
+    except ImportError as e:
+        return e, traceback.format_exc()
+
+def _find_module(module):
+    """Resolve a module's loader without running it"""
+    try:
+        if importlib.util.find_spec(module) is None:
+            return ImportError(f"No module named '{module}'"), None
+        return None, None
+    except (ImportError, ValueError) as e:
+        return e, traceback.format_exc()
+
+def check_imports(deep=False):
+    """Check if core modules can be found, or fully imported when deep is set"""
+    print("Testing imports:" if deep else "Locating modules:")
     modules = [
         'config',
         'steamcmd_manager',
@@ -33,15 +53,24 @@ def check_imports():
         'steam_api'
     ]
     
-    for module in modules:
-        try:
-            importlib.import_module(module)
-            print(f"  OK: {module} imports successfully")
-        except ImportError as e:
-            print(f"  ERROR: Failed to import {module}: {str(e)}")
-            traceback.print_exc()
+    # Imports are mostly filesystem lookups, so overlap them; report in order afterwards
+    with ThreadPoolExecutor(max_workers=len(modules)) as pool:
+        results = list(pool.map(_try_import if deep else _find_module, modules))
+    
+    for module, (error, tb) in zip(modules, results):
+        if error is None:
+            print(f"  OK: {module} {'imports successfully' if deep else 'found'}")
+        else:
+            print(f"  ERROR: Failed to {'import' if deep else 'find'} {module}: {str(error)}")
+            if tb:
+                sys.stderr.write(tb)
 
 def main():
+    parser = argparse.ArgumentParser(description="Check the application structure")
+    parser.add_argument("--deep", action="store_true",
+                        help="Fully import each module instead of only locating it")
+    args = parser.parse_args()
+    
     print_separator()
     print("STEAM GAMES DOWNLOADER - STRUCTURE CHECKER")
     print_separator()
@@ -49,7 +78,7 @@ def main():
     check_python_path()
     print_separator()
     
-    check_imports()
+    check_imports(deep=args.deep)
     print_separator()
     
     print("Check complete!")